@@ -1,9 +1,8 @@
 import pandas as pd
-import os
+import threading
+import time
 from datetime import datetime
-import matplotlib.pyplot as plt
 import streamlit as st 
-from matplotlib import dates as mdates
 import numpy as np
 
 # --- NOUVEAUX IMPORTS POUR GOOGLE SHEETS ---
@@ -12,6 +11,30 @@ from google.oauth2.service_account import Credentials
 
 # --- CONFIGURATION ---
 BANKROLL_INIT = 0.00 # Bankroll initiale fixée à 0.00
+DUREE_CACHE_DONNEES = 600 # Relecture de la feuille au plus tard après 10 min (modifications faites à la main)
+COLONNES = [
+    'Date', 'Type', 'Montant_Pari', 'Cote', 'Résultat', 
+    'Gain_Net', 'Bankroll_Finale', 'Details_Pari' 
+]
+# Position de la colonne Type (accès direct par iat)
+_TYPE_COL = COLONNES.index('Type')
+# Types explicites : catégories fixes pour que les lignes ajoutées gardent le même dtype que l'historique
+TYPES_COLONNES = {
+    'Date': 'datetime64[ns]',
+    'Type': pd.CategoricalDtype(['DEBUT', 'Pari', 'DEPOT', 'RETRAIT']),
+    'Montant_Pari': 'float64',
+    'Cote': 'float64',
+    'Résultat': pd.CategoricalDtype(['N/A', 'Gagné', 'Perdu', 'Annulé']),
+    'Gain_Net': 'float64',
+    'Bankroll_Finale': 'float64',
+    'Details_Pari': 'string',
+}
+# Gain net d'un pari selon son résultat (sert aussi à valider le résultat saisi)
+_GAIN_FN = {
+    'Gagné': lambda montant, cote: montant * cote - montant,
+    'Perdu': lambda montant, cote: -montant,
+    'Annulé': lambda montant, cote: 0.0,
+}
 # Définition des permissions d'accès (Lecture + Écriture)
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive'] 
 
@@ -24,20 +47,24 @@ st.set_page_config(layout="wide", page_title="💰 Suivi de Bankroll - Bet Track
 def connect_to_sheets():
     """Établit la connexion à Google Sheets via le compte de service."""
     
-    # 1. Vérifie la présence des secrets Streamlit
-    if not st.secrets.get("gcp_service_account") or not st.secrets.get("SHEET_ID"):
+    # 1. Lit directement les secrets Streamlit ; FileNotFoundError couvre l'absence de fichier secrets.toml
+    try:
+        secrets_dict = st.secrets["gcp_service_account"]
+        sheet_id = st.secrets["SHEET_ID"]
+    except (KeyError, FileNotFoundError):
+        secrets_dict = sheet_id = None
+    # Un secret présent mais vide (SHEET_ID = "" ou table [gcp_service_account] vide) n'est pas configuré non plus
+    if not secrets_dict or not sheet_id:
         # Cette erreur apparaîtra si l'Étape 2 de la configuration n'est pas faite.
         st.error("Les secrets de connexion Google Sheets (gcp_service_account et SHEET_ID) ne sont pas configurés. L'application ne peut pas enregistrer de données de manière persistante.")
         return None
 
     try:
         # 2. Authentification via les secrets
-        secrets_dict = st.secrets["gcp_service_account"]
         credentials = Credentials.from_service_account_info(secrets_dict, scopes=SCOPES)
         client = gspread.authorize(credentials)
         
         # 3. Ouverture de la feuille de calcul
-        sheet_id = st.secrets["SHEET_ID"]
         spreadsheet = client.open_by_key(sheet_id)
         
         # Retourne la première feuille (Worksheet)
@@ -49,173 +76,453 @@ def connect_to_sheets():
 
 
 @st.cache_resource
+def _verrou_ecriture():
+    """Verrou partagé par toutes les sessions du serveur pour sérialiser les écritures dans la feuille."""
+    return threading.Lock()
+
+
+@st.cache_resource
+def _version_donnees():
+    """Compteur d'écritures partagé par toutes les sessions : chaque écriture fait relire la feuille aux autres."""
+    return {'version': 0}
+
+
+def _lettre_colonne(numero):
+    """Lettre(s) de colonne en notation A1 (numérotation à partir de 1)."""
+    return gspread.utils.rowcol_to_a1(1, numero)[:-1]
+
+
+def _solde_cellule(ligne, col_solde):
+    """Valeur numérique de la cellule de solde d'une ligne brute, ou None si elle est vide ou non numérique."""
+    solde = pd.to_numeric(ligne[col_solde] if col_solde < len(ligne) else '', errors='coerce')
+    return None if pd.isna(solde) else float(solde)
+
+
+def _etat_feuille(rows):
+    """(nombre de lignes en-tête compris, dernier solde, colonne du solde) : sert à détecter une écriture concurrente."""
+    if not rows or 'Bankroll_Finale' not in rows[0]:
+        return len(rows), None, None
+    col_solde = rows[0].index('Bankroll_Finale')
+    return len(rows), _solde_cellule(rows[-1], col_solde), col_solde
+
+
+def _read_sheet_df(sheet):
+    """Lit l'historique depuis Google Sheets.
+
+    Renvoie (DataFrame typé ou None si la feuille est mal formée, texte des dates illisibles, état de la feuille).
+    """
+    if not sheet:
+        return None, None, None
+
+    # Lire toutes les données en liste de listes ; la première ligne sert d'en-tête.
+    # Valeurs non formatées : les nombres arrivent déjà typés (et indépendants de la locale de la feuille),
+    # seules les dates restent en texte.
+    rows = sheet.get_all_values(
+        value_render_option='UNFORMATTED_VALUE', date_time_render_option='FORMATTED_STRING'
+    )
+    etat = _etat_feuille(rows)
+    df_temp = pd.DataFrame(rows[1:], columns=rows[0]) if rows else pd.DataFrame()
+    
+    # S'assurer que les en-têtes sont corrects
+    if df_temp.empty or not all(col in df_temp.columns for col in COLONNES):
+        return None, None, etat
+
+    df = df_temp[COLONNES].copy()
+    
+    # Conversion des colonnes numériques (cellules vides ou texte -> 0.0), toujours en float64 :
+    # une colonne ne contenant que des entiers ne doit pas être inférée en int64
+    for col in ['Montant_Pari', 'Cote', 'Gain_Net', 'Bankroll_Finale']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0).astype(TYPES_COLONNES[col])
+
+    # Dates converties une seule fois ici : le reste de l'application travaille en datetime64
+    dates_texte = df['Date']
+    df['Date'], hors_iso = _convertir_dates(dates_texte)
+    # Texte d'origine de toute date hors format ISO (illisible ou interprétée jour/mois, ex. 03/04/2025) :
+    # l'interprétation ne sert qu'à l'affichage, une réécriture complète remet le texte tel quel
+    dates_non_lues = dates_texte[hors_iso & (dates_texte != '')].astype(str)
+
+    # Colonnes à faible cardinalité en catégories ; une valeur inconnue (saisie à la main dans la feuille)
+    # est ajoutée aux catégories plutôt que perdue
+    for col in ['Type', 'Résultat']:
+        connues = TYPES_COLONNES[col].categories
+        inconnues = pd.Index(df[col].dropna().unique()).difference(connues)
+        df[col] = df[col].astype(pd.CategoricalDtype(connues.append(inconnues)))
+    df['Details_Pari'] = df['Details_Pari'].astype(TYPES_COLONNES['Details_Pari'])
+    return df, dates_non_lues, etat
+
+
+@st.cache_data(ttl=DUREE_CACHE_DONNEES)
+def load_df(_sheet, version):
+    """Met en cache l'historique lu dans Sheets ; `version` (commune à toutes les sessions) change à chaque écriture."""
+    return _read_sheet_df(_sheet)
+
+
 def load_tracker():
-    """Charge le tracker et le met en cache pour qu'il ne soit chargé qu'une seule fois."""
-    return BankrollTracker(solde_initial=BANKROLL_INIT)
+    """Renvoie le tracker de la session, reconstruit seulement si la feuille a changé depuis son chargement."""
+    sheet = connect_to_sheets()
+    version = _version_donnees()['version']
+
+    # Les réexécutions dues aux widgets réutilisent le tracker déjà construit (compteurs et solde tenus à jour)
+    tracker = st.session_state.get('tracker')
+    if (tracker is not None and tracker.version == version and tracker._sheet is sheet
+            and time.monotonic() - st.session_state.tracker_charge_a < DUREE_CACHE_DONNEES):
+        return tracker
+
+    try:
+        df_sheet, dates_non_lues, etat_feuille = load_df(sheet, version)
+    except Exception as e:
+        st.warning(f"Alerte de lecture Sheets. Utilisation du DF initial. Détail: {e}")
+        # Pas de mise en cache : la lecture sera retentée à la prochaine exécution
+        st.session_state.pop('tracker', None)
+        return BankrollTracker(solde_initial=BANKROLL_INIT, sheet=sheet)
+
+    tracker = BankrollTracker(
+        solde_initial=BANKROLL_INIT, sheet=sheet, df_sheet=df_sheet, version=version,
+        etat_feuille=etat_feuille, dates_non_lues=dates_non_lues
+    )
+    st.session_state.tracker = tracker
+    st.session_state.tracker_charge_a = time.monotonic()
+    return tracker
+
+
+@st.cache_data(show_spinner=False)
+def _bankroll_quotidienne(dates, bankroll):
+    """Solde de fin de journée à partir des tableaux NumPy Date/Bankroll_Finale (mis en cache sur leur contenu)."""
+    valides = ~np.isnat(dates)
+    jours = dates[valides].astype('datetime64[D]')
+    soldes = np.asarray(bankroll, dtype=np.float64)[valides]
+    if jours.size == 0:
+        return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]), name='Bankroll')
+
+    # Dernière transaction de chaque jour : première occurrence dans le tableau inversé
+    jours_connus, idx_inverse = np.unique(jours[::-1], return_index=True)
+    soldes_connus = soldes[jours.size - 1 - idx_inverse]
+
+    # Tous les jours de la période, chacun prenant le solde du dernier jour connu (report en avant)
+    tous_les_jours = np.arange(jours_connus[0], jours_connus[-1] + 1)
+    positions = np.searchsorted(jours_connus, tous_les_jours, side='right') - 1
+    return pd.Series(soldes_connus[positions], index=pd.DatetimeIndex(tous_les_jours), name='Bankroll')
+
+
+def _cumul_bankroll(gains, depart):
+    """Soldes successifs (depart + cumul des gains) sur un tableau float64, sans tableau intermédiaire."""
+    soldes = np.cumsum(gains)
+    soldes += depart
+    return soldes
+
+
+def _date_iso(date_valeur):
+    """Formate une date (texte 'AAAA-MM-JJ', date ou datetime64) en 'AAAA-MM-JJ' pour Google Sheets."""
+    return str(np.datetime64(date_valeur, 'D'))
+
+
+def _convertir_dates(dates):
+    """Convertit des dates texte 'AAAA-MM-JJ' en datetime64 (format explicite, une analyse par date distincte).
+
+    Renvoie aussi le masque des valeurs hors format ISO, dont la conversion n'est qu'une interprétation.
+    """
+    converties = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce', cache=True)
+    # Repli pour les dates affichées au format local de la feuille (ex. 15/10/2025)
+    a_reprendre = converties.isna() & dates.notna()
+    if a_reprendre.any():
+        converties[a_reprendre] = pd.to_datetime(dates[a_reprendre], dayfirst=True, errors='coerce')
+    return converties, a_reprendre
 
 # --- CLASSE DE LOGIQUE (BankrollTracker) ---
 
 class BankrollTracker:
     
-    def __init__(self, solde_initial):
+    def __init__(self, solde_initial, sheet=None, df_sheet=None, version=None, etat_feuille=None, dates_non_lues=None):
         self.solde_initial = solde_initial
-        self._charger_ou_initialiser_df() 
+        # Version partagée de la feuille à laquelle correspond l'état en mémoire (None : à recharger)
+        self.version = version
+        # (nombre de lignes, dernier solde) attendus dans la feuille ; None si elle n'a pas pu être lue
+        self._etat_feuille = etat_feuille
+        # Vrai quand une écriture a été refusée parce qu'une autre session avait modifié la feuille
+        self.feuille_modifiee = False
+        # Texte d'origine des dates hors format ISO, indexé par position de ligne
+        self._dates_non_lues = dates_non_lues if dates_non_lues is not None else pd.Series(dtype=str)
+        # Transactions ajoutées (listes positionnelles dans l'ordre de COLONNES) pas encore intégrées au DataFrame
+        self._pending_rows = []
+        # Vrai quand des lignes déjà présentes dans Sheets doivent être réécrites
+        self._reecriture_requise = False
+        # Poignée de la feuille récupérée une seule fois pour toutes les écritures
+        self._sheet = sheet
+        # Deux sessions qui enregistrent en même temps ne doivent pas entrelacer leurs écritures
+        self._verrou = _verrou_ecriture()
+        self._charger_ou_initialiser_df(df_sheet) 
+
+    def _charger_ou_initialiser_df(self, df_sheet):
+        """Reprend le DataFrame lu dans Google Sheets ou crée une ligne initiale."""
         
-        if not self.df.empty:
-            self.bankroll_actuelle = self.df['Bankroll_Finale'].iloc[-1]
+        if df_sheet is not None:
+            self.df = df_sheet
         else:
-            self.bankroll_actuelle = solde_initial
-
-    def _charger_ou_initialiser_df(self):
-        """Charge le DataFrame depuis Google Sheets ou crée une ligne initiale."""
-        
-        self.df = pd.DataFrame() 
-        COLONNES_ATTENDUES = [
-            'Date', 'Type', 'Montant_Pari', 'Cote', 'Résultat', 
-            'Gain_Net', 'Bankroll_Finale', 'Details_Pari' 
-        ]
-
-        try:
-            sheet = connect_to_sheets()
-            
-            if sheet:
-                # Lire toutes les données. head=1 utilise la première ligne comme en-tête.
-                data = sheet.get_all_records(head=1)
-                df_temp = pd.DataFrame(data)
-                
-                # S'assurer que les en-têtes sont corrects
-                if not df_temp.empty and all(col in df_temp.columns for col in COLONNES_ATTENDUES):
-                    
-                    self.df = df_temp[COLONNES_ATTENDUES].copy()
-                    
-                    # Conversion des colonnes numériques (Sheets lit tout comme du texte)
-                    for col in ['Montant_Pari', 'Cote', 'Gain_Net', 'Bankroll_Finale']:
-                        self.df[col] = pd.to_numeric(self.df[col], errors='coerce').fillna(0.0) 
-                        
-                else:
-                    self._creer_df_initial()
-            else:
-                # Si la connexion Sheets a échoué, initialiser un DataFrame local (non persistant)
-                self.df = pd.DataFrame(columns=COLONNES_ATTENDUES)
-                self._creer_df_initial() 
-
-        except Exception as e:
-            st.warning(f"Alerte de lecture Sheets. Utilisation du DF initial. Détail: {e}")
-            self.df = pd.DataFrame(columns=COLONNES_ATTENDUES)
-            self._creer_df_initial() 
-
-        # S'assurer que la première ligne est la ligne DEBUT
-        if self.df.empty or self.df.iloc[0]['Type'] != 'DEBUT':
-             self._creer_df_initial() 
+            # Feuille vide, mal formée ou inaccessible : DataFrame local (non persistant tant que Sheets échoue)
+            self._creer_df_initial()
+
+        # S'assurer que la première ligne est la ligne DEBUT : si elle manque, elle est ajoutée en tête
+        # au lieu de repartir d'un historique vide
+        if self.df.empty or self.df.iat[0, _TYPE_COL] != 'DEBUT':
+             self._ajouter_ligne_debut() 
+        # Position de la ligne DEBUT, garantie ci-dessus
+        self._debut_idx = 0
              
-        # Recalculer l'historique après chargement pour garantir l'exactitude des totaux
-        self.calculer_bankroll_historique(self.solde_initial)
+        # Le solde courant découle des seuls Gain_Net (solde DEBUT + somme), puis est tenu à jour à chaque ajout.
+        # Scalaire Python : la valeur est envoyée telle quelle à l'API Sheets (JSON)
+        self.bankroll_actuelle = float(self.df['Bankroll_Finale'].iat[self._debut_idx] + self.df['Gain_Net'].sum())
+
+        # Bankroll_Finale est déjà enregistré : ne recalculer l'historique que si le solde final est incohérent
+        if not np.isclose(self.df['Bankroll_Finale'].iloc[-1], self.bankroll_actuelle):
+            self.calculer_bankroll_historique()
+        self._initialiser_compteurs()
+
+    def _initialiser_compteurs(self):
+        """Calcule une seule fois les totaux des paris, ensuite tenus à jour par ajouter_pari."""
+        # Une comparaison par colonne, puis uniquement des tableaux NumPy (aucune copie de DataFrame)
+        masque_paris = (self.df['Type'] == 'Pari').to_numpy(dtype=bool)
+        masque_gagnes = (self.df['Résultat'] == 'Gagné').to_numpy(dtype=bool)
+        self._n_paris = int(masque_paris.sum())
+        self._n_gagnes = int((masque_paris & masque_gagnes).sum())
+        self._total_mises = float(self.df['Montant_Pari'].to_numpy()[masque_paris].sum())
+        self._profit_paris = float(self.df['Gain_Net'].to_numpy()[masque_paris].sum())
+
+    def _ligne_debut(self, date_debut):
+        """Renvoie un DataFrame d'une seule ligne DEBUT portant le solde initial."""
+        return pd.DataFrame([[
+            date_debut, 
+            'DEBUT', 0.0, 0.0, 'N/A', 0.0, self.solde_initial, 'N/A'
+        ]], columns=COLONNES)
 
     def _creer_df_initial(self):
         """Crée un DataFrame vierge avec la ligne d'initialisation."""
-        self.df = pd.DataFrame(columns=[
-            'Date', 'Type', 'Montant_Pari', 'Cote', 'Résultat', 
-            'Gain_Net', 'Bankroll_Finale', 'Details_Pari' 
-        ])
-        self.df.loc[0] = [
-            datetime.now().strftime('%Y-%m-%d'), 
-            'DEBUT', 0.0, 0.0, 'N/A', 0.0, self.solde_initial, 'N/A'
-        ]
-
-
-    def calculer_bankroll_historique(self, solde_initial):
+        self.df = self._ligne_debut(pd.Timestamp.today().normalize()).astype(TYPES_COLONNES)
+        # La feuille ne contient pas (encore) cet historique : elle devra être réécrite en entier
+        self._reecriture_requise = True
+
+    def _ajouter_ligne_debut(self):
+        """Insère en tête de l'historique chargé la ligne DEBUT manquante, datée de la première transaction."""
+        date_debut = self.df['Date'].min()
+        if pd.isna(date_debut):
+            date_debut = pd.Timestamp.today().normalize()
+        ligne_debut = self._ligne_debut(date_debut).astype(self.df.dtypes.to_dict())
+        self.df = pd.concat([ligne_debut, self.df], ignore_index=True)
+        self._dates_non_lues = self._dates_non_lues.set_axis(self._dates_non_lues.index + 1)
+        # Toutes les lignes de la feuille sont décalées : elle devra être réécrite en entier
+        self._reecriture_requise = True
+
+
+    def calculer_bankroll_historique(self):
         """Recalcule la colonne Bankroll_Finale en cas de besoin."""
         
         if self.df.empty:
             return
 
-        idx_debut = self.df[self.df['Type'] == 'DEBUT'].index
-        
-        if not idx_debut.empty:
-            start_solde = self.df.loc[idx_debut[0], 'Bankroll_Finale']
-            
-            self.df['Gain_Net_Cumule'] = self.df['Gain_Net'].cumsum()
-            self.df['Bankroll_Finale'] = start_solde + self.df['Gain_Net_Cumule']
-            self.df.drop(columns=['Gain_Net_Cumule'], inplace=True, errors='ignore')
+        ancienne_bankroll = self.df['Bankroll_Finale'].to_numpy(dtype=float)
+        start_solde = self.df.iat[self._debut_idx, self.df.columns.get_loc('Bankroll_Finale')]
+
+        self.df['Bankroll_Finale'] = _cumul_bankroll(self.df['Gain_Net'].to_numpy(dtype=np.float64), float(start_solde))
+        self.bankroll_actuelle = float(self.df['Bankroll_Finale'].iloc[-1])
+
+        # Des lignes existantes ont changé : l'ajout ligne à ligne ne suffit plus
+        if not np.allclose(ancienne_bankroll, self.df['Bankroll_Finale'].to_numpy(dtype=float)):
+            self._reecriture_requise = True
 
-            self.bankroll_actuelle = self.df['Bankroll_Finale'].iloc[-1]
-        else:
-            self.df['Bankroll_Finale'] = solde_initial + self.df['Gain_Net'].cumsum()
-            self.bankroll_actuelle = self.df['Bankroll_Finale'].iloc[-1]
 
+    @property
+    def df(self):
+        """Historique complet ; les transactions en attente n'y sont intégrées qu'au moment de la lecture."""
+        self._materialiser()
+        return self._df
 
-    def _sauvegarder(self):
-        """Sauvegarde le DataFrame entier dans Google Sheets."""
-        sheet = connect_to_sheets()
+    @df.setter
+    def df(self, valeur):
+        self._df = valeur
+
+    def _materialiser(self):
+        """Intègre en une seule concaténation les transactions en attente dans le DataFrame."""
+        if not self._pending_rows:
+            return
+        nouvelles_lignes = pd.DataFrame(self._pending_rows, columns=COLONNES)
+        nouvelles_lignes['Date'], _ = _convertir_dates(nouvelles_lignes['Date'])
+        # Mêmes dtypes (et mêmes catégories) que l'historique chargé : la concaténation les conserve
+        nouvelles_lignes = nouvelles_lignes.astype(self._df.dtypes.to_dict())
+        self._df = pd.concat([self._df, nouvelles_lignes], ignore_index=True)
+        self._pending_rows.clear()
+
+    def _sauvegarder(self, lignes):
+        """Enregistre les nouvelles transactions (soldes calculés ici) dans Google Sheets, sous le verrou partagé."""
+        with self._verrou:
+            if self._sheet:
+                # La feuille n'a pas pu être lue : rien n'est écrit par-dessus un historique inconnu
+                if self._etat_feuille is None:
+                    self.version = None
+                    return False
+                # Une autre session a écrit depuis le chargement : ni solde ni réécriture calculés sur un état périmé
+                if not self._feuille_inchangee():
+                    self.feuille_modifiee = True
+                    self.version = None
+                    return False
+
+            solde = self.bankroll_actuelle
+            for ligne in lignes:
+                solde += ligne[5]
+                ligne[6] = solde
+
+            try:
+                ecrit = self._ecrire(lignes)
+            except Exception:
+                # Écriture interrompue : la feuille a pu être modifiée en partie, la session la rechargera
+                self.version = None
+                raise
+
+            if not ecrit:
+                # Rien n'a été enregistré : l'état en mémoire reste inchangé, la feuille sera relue
+                self.version = None
+                return False
+
+            # Transactions enregistrées : elles n'entrent qu'à ce moment dans l'état en mémoire
+            self._pending_rows.extend(lignes)
+            self.bankroll_actuelle = solde
+            self._compter(lignes)
+            # Les autres sessions (et le cache load_df) verront la nouvelle version et reliront la feuille
+            versions = _version_donnees()
+            versions['version'] += 1
+            self.version = versions['version']
+            return True
+
+    def _feuille_inchangee(self):
+        """Vérifie que la feuille est toujours dans l'état connu de cette session.
+
+        Seules la dernière ligne attendue et la suivante sont relues : la vérification ne dépend pas de la taille
+        de l'historique.
+        """
+        nb_attendu, solde_attendu, col_solde = self._etat_feuille
+        derniere_colonne = _lettre_colonne(max(len(COLONNES), (col_solde or 0) + 1))
+        valeurs = self._sheet.get(
+            f"A{max(nb_attendu, 1)}:{derniere_colonne}{nb_attendu + 1}", value_render_option='UNFORMATTED_VALUE'
+        )
+        # L'API ne renvoie pas les lignes vides en fin de plage
+        remplies = [any(cellule != '' for cellule in ligne) for ligne in valeurs]
+        if nb_attendu == 0:
+            return not any(remplies)
+        # La dernière ligne attendue doit être remplie et la suivante vide
+        if not remplies or not remplies[0] or any(remplies[1:]):
+            return False
+        if col_solde is None:
+            return True
+        solde = _solde_cellule(valeurs[0], col_solde)
+        if solde is None or solde_attendu is None:
+            return solde is None and solde_attendu is None
+        return bool(np.isclose(solde, solde_attendu))
+
+    def _ecrire(self, lignes):
+        """Envoie les transactions à Google Sheets (réécriture complète si nécessaire) ; appelée sous le verrou."""
+        if self._reecriture_requise:
+            return self._resauvegarder_tout(lignes)
+
+        sheet = self._sheet
         if sheet:
-            # Conversion du DataFrame en liste de listes (y compris les en-têtes)
-            data_to_write = [self.df.columns.values.tolist()] + self.df.values.tolist()
+            # Les dates sont gardées telles quelles en mémoire et mises au format texte seulement ici
+            sheet.append_rows(
+                [[_date_iso(ligne[0])] + ligne[1:] for ligne in lignes],
+                value_input_option='USER_ENTERED'
+            )
+            nb_lignes, _, col_solde = self._etat_feuille
+            self._etat_feuille = (nb_lignes + len(lignes), float(lignes[-1][6]), col_solde)
+            return True
+        return False
+
+    def _resauvegarder_tout(self, lignes):
+        """Réécrit dans Google Sheets le DataFrame entier suivi des nouvelles transactions `lignes`."""
+        sheet = self._sheet
+        if sheet:
+            # Conversion du DataFrame en liste de listes (y compris les en-têtes), dates au format texte ;
+            # une date hors format ISO au chargement est réécrite avec son texte d'origine
+            dates = self.df['Date'].dt.strftime('%Y-%m-%d')
+            dates.update(self._dates_non_lues)
+            dates = dates.fillna('')
+            df_sheet = self.df.assign(Date=dates)
+            data_to_write = (
+                [df_sheet.columns.values.tolist()]
+                + df_sheet.astype(object).fillna('').values.tolist()
+                + [[_date_iso(ligne[0])] + ligne[1:] for ligne in lignes]
+            )
             
-            # Écrit les données dans la feuille (écrase le contenu existant)
-            sheet.clear()
-            sheet.update(data_to_write, value_input_option='USER_ENTERED')
+            # Écrase le contenu depuis A1 puis efface les anciennes lignes au-delà : la feuille n'est jamais
+            # vidée avant l'écriture, un échec en cours de route ne perd donc pas l'historique
+            sheet.update(data_to_write, 'A1', value_input_option='USER_ENTERED')
+            sheet.batch_clear([f"A{len(data_to_write) + 1}:{_lettre_colonne(len(COLONNES))}"])
+            self._etat_feuille = (len(data_to_write), float(data_to_write[-1][6]), COLONNES.index('Bankroll_Finale'))
+            self._reecriture_requise = False
             return True
         return False
 
-    def ajouter_pari(self, date_str, montant_pari, cote, resultat, details_pari="Général"): 
-        """Ajoute une nouvelle transaction de type 'Pari'."""
+    def ajouter_pari(self, date_pari, montant_pari, cote, resultat, details_pari="Général"): 
+        """Ajoute une nouvelle transaction de type 'Pari' (date : date ou texte 'AAAA-MM-JJ')."""
         
-        if resultat not in ['Gagné', 'Perdu', 'Annulé']:
+        calcul_gain = _GAIN_FN.get(resultat)
+        if calcul_gain is None:
             return "Erreur: Le résultat doit être 'Gagné', 'Perdu' ou 'Annulé'."
 
-        if resultat == 'Gagné':
-            gain_net = (montant_pari * cote) - montant_pari
-        elif resultat == 'Perdu':
-            gain_net = -montant_pari
-        else:
-            gain_net = 0.0
-
-        nouvelle_bankroll = self.bankroll_actuelle + gain_net
+        gain_net = calcul_gain(montant_pari, cote)
 
-        nouvelle_entree = pd.Series({
-            'Date': date_str, 'Type': 'Pari', 'Montant_Pari': montant_pari, 
-            'Cote': cote, 'Résultat': resultat, 'Gain_Net': gain_net, 
-            'Bankroll_Finale': nouvelle_bankroll, 'Details_Pari': details_pari
-        })
+        # Bankroll_Finale est calculée à l'enregistrement, sur l'état vérifié de la feuille
+        ligne = [
+            date_pari, 'Pari', montant_pari, cote, resultat, 
+            gain_net, None, details_pari
+        ]
+        return self._sauvegarder([ligne])
 
-        self.df.loc[len(self.df)] = nouvelle_entree
-        self.bankroll_actuelle = nouvelle_bankroll
-        return self._sauvegarder()
+    def _compter(self, lignes):
+        """Tient à jour les totaux des paris avec les transactions acceptées."""
+        for _, type_ligne, montant_pari, _, resultat, gain_net, _, _ in lignes:
+            if type_ligne == 'Pari':
+                self._n_paris += 1
+                self._n_gagnes += resultat == 'Gagné'
+                self._total_mises += montant_pari
+                self._profit_paris += gain_net
 
     def ajouter_fonds(self, montant, type_operation='DEPOT'):
-        """Ajoute une transaction de dépôt ou de retrait."""
-        
-        if type_operation not in ['DEPOT', 'RETRAIT']:
-            return "Erreur: Le type doit être 'DEPOT' ou 'RETRAIT'."
+        """Ajoute une transaction de dépôt ou de retrait datée d'aujourd'hui."""
+        return self.ajouter_fonds_batch([(np.datetime64('today'), montant, type_operation)])
 
-        gain_net = montant if type_operation == 'DEPOT' else -montant
-        nouvelle_bankroll = self.bankroll_actuelle + gain_net
+    def ajouter_fonds_batch(self, entrees):
+        """Ajoute plusieurs dépôts/retraits (date, montant, type_operation) enregistrés en un seul envoi.
 
-        nouvelle_entree = pd.Series({
-            'Date': datetime.now().strftime('%Y-%m-%d'), 'Type': type_operation, 
-            'Montant_Pari': 0.0, 'Cote': 0.0, 'Résultat': 'N/A', 'Gain_Net': gain_net, 
-            'Bankroll_Finale': nouvelle_bankroll, 'Details_Pari': 'N/A'
-        })
+        Les dates peuvent être des textes 'AAAA-MM-JJ' déjà formatés ou des dates (np.datetime64, date).
+        """
         
-        self.df.loc[len(self.df)] = nouvelle_entree
-        self.bankroll_actuelle = nouvelle_bankroll
-        return self._sauvegarder()
+        # Rien à enregistrer : pas d'appel à l'API Sheets
+        if not entrees:
+            return True
+        if any(type_operation not in ['DEPOT', 'RETRAIT'] for _, _, type_operation in entrees):
+            return "Erreur: Le type doit être 'DEPOT' ou 'RETRAIT'."
+        if any(montant <= 0 for _, montant, _ in entrees):
+            return "Erreur: Le montant doit être positif."
+
+        lignes = []
+        for date_operation, montant, type_operation in entrees:
+            gain_net = montant if type_operation == 'DEPOT' else -montant
+            lignes.append([
+                date_operation, type_operation, 0.0, 0.0, 'N/A', 
+                gain_net, None, 'N/A'
+            ])
+        return self._sauvegarder(lignes)
     
     def calculer_statistiques(self):
         """Calcule les statistiques clés de la bankroll et les retourne."""
-        paris_df = self.df[self.df['Type'] == 'Pari'].copy()
 
-        if paris_df.empty:
+        if self._n_paris == 0:
             return None
 
-        total_paris = len(paris_df)
-        total_mises = paris_df['Montant_Pari'].sum()
-        profit_total = paris_df['Gain_Net'].sum()
+        total_paris = self._n_paris
+        total_mises = self._total_mises
+        profit_total = self._profit_paris
         
         roi_pour_paris = (profit_total / total_mises) * 100 if total_mises > 0 else 0.0
 
-        paris_gagnes = len(paris_df[paris_df['Résultat'] == 'Gagné'])
-        taux_reussite = (paris_gagnes / total_paris) * 100
+        taux_reussite = (self._n_gagnes / total_paris) * 100
 
         stats = {
             "Solde Actuel": f"{self.bankroll_actuelle:.2f} €",
@@ -227,38 +534,15 @@ class BankrollTracker:
         }
         return stats
 
-    def creer_figure_graphique(self):
-        """Crée la figure Matplotlib pour le graphique d'évolution."""
-        
-        fig, ax = plt.subplots(figsize=(8, 4))
-        
-        df_plot = self.df.copy()
-        df_plot['Date'] = pd.to_datetime(df_plot['Date']) 
-        
-        daily_bankroll = df_plot.set_index('Date')['Bankroll_Finale'].resample('D').last().ffill()
-        
-        if not daily_bankroll.empty:
-            ax.plot(daily_bankroll.index, daily_bankroll.values, marker='o', linestyle='-', color='blue', label='Bankroll')
-            ax.set_title('Évolution Quotidienne de la Bankroll', fontsize=14)
-            ax.set_xlabel('Date', fontsize=10)
-            ax.set_ylabel('Solde (€)', fontsize=10)
-            ax.grid(True, linestyle='--', alpha=0.6)
-            
-            date_fmt = mdates.DateFormatter('%d-%m') 
-            ax.xaxis.set_major_formatter(date_fmt)
-            locator = mdates.AutoDateLocator()
-            ax.xaxis.set_major_locator(locator)
-            fig.autofmt_xdate(rotation=45)
-            
-        else:
-             ax.text(0.5, 0.5, "Pas de données pour le graphique d'évolution.", 
-                     horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-
-        return fig
+    def calculer_bankroll_quotidienne(self):
+        """Renvoie la série du solde quotidien pour le graphique d'évolution."""
+        return _bankroll_quotidienne(self.df['Date'].to_numpy(), self.df['Bankroll_Finale'].to_numpy())
 
 # --- FONCTIONS UTILITAIRES STREAMLIT ---
 
-# @st.cache_resource def load_tracker(): est au-dessus
+FEUILLE_MODIFIEE = "La feuille a été modifiée depuis une autre session : rien n'a été enregistré. Les données vont être rechargées, recommencez la saisie."
+
+# def load_tracker(): est au-dessus
 
 def display_stats(tracker):
     """Affiche les statistiques dans la colonne de visualisation."""
@@ -283,22 +567,22 @@ def display_stats(tracker):
 def add_pari(tracker, form_data):
     """Gère l'ajout d'un pari depuis le formulaire."""
     try:
-        date_str = form_data['date']
+        date_pari = form_data['date']
         montant = float(form_data['montant'])
         cote = float(form_data['cote'])
         details_pari = form_data['details_pari']
         resultat = form_data['resultat']
         
-        datetime.strptime(date_str, '%Y-%m-%d')
-        
         if montant <= 0 or cote < 1.0:
             st.error("Montant ou cote invalide (doivent être positifs et cote >= 1.0).")
             return
 
-        if tracker.ajouter_pari(date_str, montant, cote, resultat, details_pari):
-            st.success("Pari enregistré avec succès ! L'application se rafraîchit...")
-            st.cache_resource.clear() # Vide le cache pour forcer la relecture des données Sheets
-            st.experimental_rerun()
+        if tracker.ajouter_pari(date_pari, montant, cote, resultat, details_pari):
+            # Pas de st.rerun() : la colonne de visualisation est rendue après les formulaires,
+            # avec le tracker déjà à jour
+            st.success("Pari enregistré avec succès !")
+        elif tracker.feuille_modifiee:
+            st.warning(FEUILLE_MODIFIEE)
         else:
             st.error("Erreur de sauvegarde. Vérifiez votre connexion à Google Sheets.")
 
@@ -327,7 +611,7 @@ def main():
         with st.form("form_pari", clear_on_submit=True):
             st.subheader("Ajouter un Pari")
             
-            date_pari = st.date_input("Date du Pari", datetime.now(), format="YYYY-MM-DD").strftime('%Y-%m-%d')
+            date_pari = st.date_input("Date du Pari", datetime.now(), format="YYYY-MM-DD")
             montant = st.number_input("Montant Parié (€)", min_value=0.01, format="%.2f", step=1.0)
             cote = st.number_input("Cote", min_value=1.00, format="%.2f", step=0.01)
             
@@ -358,9 +642,9 @@ def main():
             
             if submitted_fonds:
                 if tracker.ajouter_fonds(montant_fonds, type_operation):
-                    st.success(f"{type_operation} enregistré avec succès ! L'application se rafraîchit...")
-                    st.cache_resource.clear()
-                    st.experimental_rerun()
+                    st.success(f"{type_operation} enregistré avec succès !")
+                elif tracker.feuille_modifiee:
+                    st.warning(FEUILLE_MODIFIEE)
                 else:
                     st.error("Erreur lors de l'opération de fonds.")
 
@@ -371,14 +655,25 @@ def main():
 
         st.markdown("---")
         
-        st.pyplot(tracker.creer_figure_graphique())
+        # Graphique natif Streamlit (Vega-Lite) : rendu côté navigateur, sans rastérisation côté serveur
+        st.markdown("### 📈 Évolution Quotidienne de la Bankroll")
+        daily_bankroll = tracker.calculer_bankroll_quotidienne()
+        if not daily_bankroll.empty:
+            st.line_chart(daily_bankroll, x_label='Date', y_label='Solde (€)')
+        else:
+            st.info("Pas de données pour le graphique d'évolution.")
         
         st.markdown("### Historique des Transactions")
         
-        # Affichage du DataFrame avec la colonne renommée
-        df_affichage = tracker.df.rename(columns={'Details_Pari': 'Détails du pari'})
-        
-        st.dataframe(df_affichage.tail(10), use_container_width=True)
+        # Affichage des 10 dernières lignes ; la colonne est renommée par son libellé d'affichage
+        # plutôt que par une copie renommée de tout l'historique
+        st.dataframe(
+            tracker.df.tail(10), use_container_width=True,
+            column_config={
+                'Date': st.column_config.DateColumn(format='YYYY-MM-DD'),
+                'Details_Pari': 'Détails du pari',
+            }
+        )
 
 
 if __name__ == '__main__':